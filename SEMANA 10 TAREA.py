@@ -7,6 +7,8 @@ Formato del archivo: CSV UTF-8 con encabezado (id,nombre,cantidad,precio)
 - Se crea automáticamente si no existe.
 - Las operaciones que modifican el inventario (agregar/actualizar/eliminar)
   intentan guardar de inmediato y reportan al usuario si se guardó o no.
+  Agregar solo añade la fila nueva al final; actualizar reescribe solo su línea
+  cuando la longitud no cambia; en otro caso (y al eliminar) se reescribe el archivo.
 - Durante la carga se ignoran líneas corruptas y se informa cuántas hubo.
 
 NOTA: Seguimos cumpliendo el requisito de usar LISTA como estructura principal
@@ -14,9 +16,49 @@ NOTA: Seguimos cumpliendo el requisito de usar LISTA como estructura principal
 """
 
 from __future__ import annotations
-from typing import List, Optional, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
 import csv
+import io
 import os
+import shutil
+import sys
+
+
+def _a_precio(valor) -> float:
+    """
+    Convierte un precio a float aceptando coma decimal ("2,50").
+    Si ya es un número (caso de carga y de la UI), evita pasar por str() + replace().
+    """
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return float(valor)
+    return float(str(valor).replace(",", "."))
+
+
+# Formato de Producto.__str__, resuelto una sola vez (método format ya ligado)
+_ROW_FMT = "ID: {0} | Nombre: {1} | Cant.: {2} | Precio: ${3:,.2f}".format
+
+# Caracteres que obligan a csv.writer a entrecomillar un campo
+_CARACTERES_CSV = (",", '"', "\r", "\n")
+
+
+def _tiene_salto_linea(texto: str) -> bool:
+    return "\n" in texto or "\r" in texto
+
+
+def _partir_linea(crudo: bytes) -> List[str]:
+    """
+    Separa una línea (o un registro de varias líneas con un campo entrecomillado)
+    del archivo en columnas.
+    Nuestras filas casi nunca llevan comillas, así que basta con split(","); solo
+    si aparece '"' usamos csv.reader para respetar campos entrecomillados.
+    Lanza ValueError si la línea no es UTF-8 válido.
+    """
+    linea = crudo.decode("utf-8").rstrip("\r\n")
+    if '"' in linea:
+        return next(csv.reader([linea]), [])
+    return linea.split(",")
 
 
 class Producto:
@@ -33,10 +75,21 @@ class Producto:
       - El enunciado lo requiere. Además, permiten validar y normalizar cuando se actualiza.
     """
 
+    # Sin __dict__ por instancia: menos memoria y acceso a atributos más rápido
+    __slots__ = ("_id", "_nombre", "_nombre_lower", "_cantidad", "_precio", "_linea_csv")
+
+    # Se incrementa en cada set_nombre: Inventario la usa para invalidar su caché de búsquedas
+    _generacion_nombres = 0
+
     def __init__(self, id_: str, nombre: str, cantidad: int, precio: float):
         # Guardamos “protegido” con _ prefijo para forzar el uso de getters/setters si hiciera falta.
-        self._id = str(id_).strip()
-        self._nombre = str(nombre).strip()
+        # Evitamos str() cuando ya recibimos texto (caso habitual): una copia menos.
+        # El ID se "interna" (sys.intern): IDs iguales comparten el mismo objeto str y
+        # las búsquedas en el índice por ID pueden resolverse por identidad.
+        self._id = sys.intern(id_.strip() if isinstance(id_, str) else str(id_).strip())
+        self._nombre = nombre.strip() if isinstance(nombre, str) else str(nombre).strip()
+        # Nombre en minúsculas precalculado para que buscar_por_nombre no repita .lower()
+        self._nombre_lower = self._nombre.lower()
 
         # Convertimos y validamos cantidad como entero no negativo
         try:
@@ -48,17 +101,25 @@ class Producto:
 
         # Precio: aceptamos coma decimal por comodidad de entrada
         try:
-            self._precio = float(str(precio).replace(",", "."))
+            self._precio = _a_precio(precio)
         except (TypeError, ValueError):
             raise ValueError("El precio debe ser un número.")
         if self._precio < 0:
             raise ValueError("El precio no puede ser negativo.")
 
+        # Línea CSV serializada bajo demanda (ver to_csv_line); los setters la invalidan
+        self._linea_csv: Optional[str] = None
+
         # Validaciones de campos de texto
         if not self._id:
             raise ValueError("El ID no puede estar vacío.")
         if not self._nombre:
             raise ValueError("El nombre no puede estar vacío.")
+        # Cada producto ocupa UNA línea del archivo (el cargador lee línea por línea)
+        if _tiene_salto_linea(self._id):
+            raise ValueError("El ID no puede contener saltos de línea.")
+        if _tiene_salto_linea(self._nombre):
+            raise ValueError("El nombre no puede contener saltos de línea.")
 
     # --- Getters (cumplen requisito) ---
     def get_id(self) -> str:
@@ -67,6 +128,9 @@ class Producto:
     def get_nombre(self) -> str:
         return self._nombre
 
+    def get_nombre_lower(self) -> str:
+        return self._nombre_lower
+
     def get_cantidad(self) -> int:
         return self._cantidad
 
@@ -78,7 +142,12 @@ class Producto:
         nuevo_nombre = str(nuevo_nombre).strip()
         if not nuevo_nombre:
             raise ValueError("El nombre no puede estar vacío.")
+        if _tiene_salto_linea(nuevo_nombre):
+            raise ValueError("El nombre no puede contener saltos de línea.")
         self._nombre = nuevo_nombre
+        self._nombre_lower = nuevo_nombre.lower()
+        self._linea_csv = None
+        Producto._generacion_nombres += 1
 
     def set_cantidad(self, nueva_cantidad: int) -> None:
         try:
@@ -88,24 +157,43 @@ class Producto:
         if nueva_cantidad < 0:
             raise ValueError("La cantidad no puede ser negativa.")
         self._cantidad = nueva_cantidad
+        self._linea_csv = None
 
     def set_precio(self, nuevo_precio: float) -> None:
         try:
-            nuevo_precio = float(str(nuevo_precio).replace(",", "."))
+            nuevo_precio = _a_precio(nuevo_precio)
         except (TypeError, ValueError):
             raise ValueError("El precio debe ser un número.")
         if nuevo_precio < 0:
             raise ValueError("El precio no puede ser negativo.")
         self._precio = nuevo_precio
+        self._linea_csv = None
 
     def __str__(self) -> str:
-        return f"ID: {self._id} | Nombre: {self._nombre} | Cant.: {self._cantidad} | Precio: ${self._precio:,.2f}"
+        return _ROW_FMT(self._id, self._nombre, self._cantidad, self._precio)
 
     # --- Serialización a/desde CSV (para persistencia en texto) ---
     def to_csv_row(self) -> List[str]:
         """Devuelve la fila CSV en orden [id, nombre, cantidad, precio]."""
         return [self._id, self._nombre, str(self._cantidad), f"{self._precio:.2f}"]
 
+    def to_csv_line(self) -> str:
+        """
+        Devuelve la línea CSV completa (con su fin de línea "\r\n"), idéntica a la
+        que produciría csv.writer con to_csv_row(), para escribirla directamente.
+        Si el ID o el nombre tienen comas o comillas se delega en csv.writer para
+        entrecomillar bien (los saltos de línea se rechazan al crear/renombrar). Se calcula una sola vez y se reutiliza
+        hasta que un setter modifique el producto.
+        """
+        if self._linea_csv is None:
+            if any(c in self._id or c in self._nombre for c in _CARACTERES_CSV):
+                buf = io.StringIO()
+                csv.writer(buf).writerow(self.to_csv_row())
+                self._linea_csv = buf.getvalue()
+            else:
+                self._linea_csv = f"{self._id},{self._nombre},{self._cantidad},{self._precio:.2f}\r\n"
+        return self._linea_csv
+
     @staticmethod
     def from_csv_row(row: List[str]) -> "Producto":
         """
@@ -117,6 +205,27 @@ class Producto:
         id_, nombre, cantidad, precio = row
         return Producto(id_, nombre, int(cantidad), float(precio))
 
+    @classmethod
+    def _from_trusted_row(cls, row: List[str]) -> "Producto":
+        """
+        Camino rápido para filas de NUESTRO propio archivo: evita __init__ y sus
+        conversiones repetidas (str(), replace de coma, try/except por campo).
+        Solo hace int()/float() y los chequeos mínimos; ante cualquier duda lanza
+        ValueError para que el llamador recurra a from_csv_row (camino validado).
+        """
+        id_, nombre, cantidad, precio = row
+        obj = cls.__new__(cls)
+        obj._id = id_.strip()  # se interna al incorporarlo al inventario (ver _cargar_desde_archivo)
+        obj._nombre = nombre.strip()
+        obj._nombre_lower = obj._nombre.lower()
+        obj._cantidad = int(cantidad)
+        obj._precio = float(precio)
+        obj._linea_csv = None
+        if (not obj._id or not obj._nombre or obj._cantidad < 0 or obj._precio < 0
+                or _tiene_salto_linea(obj._id) or _tiene_salto_linea(obj._nombre)):
+            raise ValueError("Fila no confiable; se requiere validación completa.")
+        return obj
+
 
 class Inventario:
     """
@@ -126,15 +235,46 @@ class Inventario:
     Métodos de modificación (agregar/eliminar/actualizar) guardan al archivo
     inmediatamente y retornan una tupla (ok: bool, msg: str) para que la UI
     informe el resultado tanto lógico como de persistencia.
+
+    Mantiene el archivo abierto entre operaciones: usar 'with Inventario(...) as inv:'
+    o llamar a close() al terminar (ver close()).
     """
 
     ENCABEZADO = ["id", "nombre", "cantidad", "precio"]
+    # Tamaño del búfer de E/S (1 MiB): menos llamadas al sistema al leer/escribir todo el archivo
+    BUFFER_ES = 1 << 20
+    MSG_LOTE = "Cambio aplicado en memoria; se guardará al terminar el lote."
+    # Cantidad de búsquedas recientes que se recuerdan (ver buscar_por_nombre)
+    TAMANO_CACHE_BUSQUEDA = 64
 
     def __init__(self, ruta_archivo: str = "inventario.txt"):
         self.productos: List[Producto] = []
+        # Índice auxiliar id -> Producto para búsquedas O(1). La LISTA sigue siendo
+        # la estructura principal; este dict solo acelera _existe_id/_buscar_por_id.
+        self._by_id: Dict[str, Producto] = {}
+        # Posición de cada fila en el archivo: id -> (offset en bytes, longitud en bytes).
+        # Permite que actualizar() reescriba solo esa línea si su longitud no cambia.
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        # Estado de batch(): profundidad de anidamiento, si hay cambios sin guardar
+        # y el resultado (ok, msg) del último guardado de lote.
+        self._batch_depth = 0
+        self._batch_dirty = False
+        self.resultado_lote: Optional[Tuple[bool, str]] = None
+        # Caché LRU termino -> resultados de buscar_por_nombre. Se vacía al agregar/eliminar
+        # y cuando cambia algún nombre (Producto._generacion_nombres).
+        self._search_cache: "OrderedDict[str, List[Producto]]" = OrderedDict()
+        self._search_generacion = Producto._generacion_nombres
+        # Manejador del archivo abierto en "r+b" durante toda la vida del inventario,
+        # para altas y parches sin reabrir el archivo cada vez (ver _abrir_handle).
+        self._fh: Optional[BinaryIO] = None
+        self._cerrado = False  # tras close() ya no se vuelve a abrir el manejador
+        # True si algún guardado falló y el archivo ya no refleja la memoria: mientras
+        # lo sea, altas y parches hacen una reescritura completa (que lo repara).
+        self._archivo_desincronizado = False
         self.ruta_archivo = ruta_archivo
         creado, msg = self._asegurar_archivo()
         cargados, corruptas, msg_carga = self._cargar_desde_archivo()
+        self._abrir_handle()
         # Mensajes informativos para la UI (se exponen vía propiedades)
         self.info_inicio = {
             "archivo_creado": creado,
@@ -146,20 +286,33 @@ class Inventario:
 
     # -------- API pública requerida --------
     def agregar_producto(self, producto: Producto) -> Tuple[bool, str]:
-        if self._existe_id(producto.get_id()):
+        # Comprobación e inserción en el índice en un solo paso: si el dict no creció,
+        # el ID ya existía (también cubre volver a agregar el mismo objeto)
+        antes = len(self._by_id)
+        self._by_id.setdefault(producto.get_id(), producto)
+        if len(self._by_id) == antes:
             return False, f"Ya existe un producto con ID '{producto.get_id()}'."
         self.productos.append(producto)
-        ok, msg = self._guardar_a_archivo()
+        self._search_cache.clear()
+        if self._batch_depth:
+            self._batch_dirty = True
+            return True, self.MSG_LOTE
+        # Un alta solo necesita añadir una fila al final (no reescribir todo)
+        ok, msg = self._append_to_archivo(producto)
         return ok, msg if ok else f"Agregado en memoria, pero no se pudo guardar: {msg}"
 
     def eliminar_por_id(self, id_producto: str) -> Tuple[bool, str]:
-        id_producto = str(id_producto).strip()
-        for i, p in enumerate(self.productos):
-            if p.get_id() == id_producto:
-                del self.productos[i]
-                ok, msg = self._guardar_a_archivo()
-                return (ok, msg) if ok else (True, f"Eliminado en memoria, pero no se pudo guardar: {msg}")
-        return False, "No se encontró un producto con ese ID."
+        prod = self._buscar_por_id(id_producto)
+        if not prod:
+            return False, "No se encontró un producto con ese ID."
+        self.productos.remove(prod)
+        del self._by_id[prod.get_id()]
+        self._search_cache.clear()
+        if self._batch_depth:
+            self._batch_dirty = True
+            return True, self.MSG_LOTE
+        ok, msg = self._guardar_a_archivo()
+        return (ok, msg) if ok else (True, f"Eliminado en memoria, pero no se pudo guardar: {msg}")
 
     def actualizar(
         self,
@@ -177,19 +330,112 @@ class Inventario:
                 prod.set_precio(precio)
         except Exception as e:
             return False, f"Validación fallida: {e}"
-        ok, msg = self._guardar_a_archivo()
+        if self._batch_depth:
+            self._batch_dirty = True
+            return True, self.MSG_LOTE
+        # Caso común (p. ej. cantidad 10 -> 20): la línea mide lo mismo y se parchea en su lugar
+        ok, msg = self._parchear_linea(prod)
+        if ok is None:
+            ok, msg = self._guardar_a_archivo()
         return (ok, msg) if ok else (True, f"Actualizado en memoria, pero no se pudo guardar: {msg}")
 
+    @contextmanager
+    def batch(self) -> Iterator["Inventario"]:
+        """
+        Agrupa varias modificaciones y guarda el archivo UNA sola vez al salir:
+
+            with inventario.batch():
+                for p in nuevos:
+                    inventario.agregar_producto(p)
+
+        Dentro del bloque, agregar/eliminar/actualizar solo cambian la memoria y
+        devuelven (True, MSG_LOTE). Al salir del bloque más externo se reescribe el
+        archivo si hubo cambios, y el resultado queda en self.resultado_lote.
+        Se puede anidar; solo el bloque más externo guarda.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._batch_dirty:
+                self.resultado_lote = self._guardar_a_archivo()
+                self._batch_dirty = False
+
     def buscar_por_nombre(self, termino: str) -> List[Producto]:
         termino = str(termino).strip().lower()
         if not termino:
             return []
-        return [p for p in self.productos if termino in p.get_nombre().lower()]
+        cache = self._search_cache
+        if self._search_generacion != Producto._generacion_nombres:
+            cache.clear()
+            self._search_generacion = Producto._generacion_nombres
+        resultados = cache.get(termino)
+        if resultados is None:
+            # Acceso directo al atributo (mismo módulo): evita una llamada a getter por producto
+            resultados = [p for p in self.productos if termino in p._nombre_lower]
+            cache[termino] = resultados
+            if len(cache) > self.TAMANO_CACHE_BUSQUEDA:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(termino)
+        # Copia para que quien llama pueda modificar su lista sin tocar la caché
+        return list(resultados)
+
+    def mostrar_todos(self) -> Sequence[Producto]:
+        """
+        Devuelve la lista interna SIN copiarla (O(1)), pensada solo para recorrerla.
+        No modificarla: el índice por ID y el archivo se desincronizarían.
+        Si se necesita una copia independiente, usar snapshot().
+        """
+        return self.productos
 
-    def mostrar_todos(self) -> List[Producto]:
+    def snapshot(self) -> List[Producto]:
+        """Copia superficial de la lista de productos (segura de modificar)."""
         return list(self.productos)
 
+    def close(self) -> None:
+        """
+        Cierra el archivo que el inventario mantiene abierto (se puede llamar varias veces).
+        Si luego se sigue usando el inventario, cada operación abre el archivo por su cuenta.
+        No hay finalizador (__del__): quien crea el inventario debe llamar a close() o usar
+        'with Inventario(...) as inv:'; si no, el descriptor queda abierto hasta que el
+        recolector libere el objeto (con ResourceWarning si están activados los avisos).
+        """
+        self._cerrado = True
+        self._cerrar_handle()
+
+    def _cerrar_handle(self) -> None:
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except OSError:
+                pass
+            self._fh = None
+
+    def __enter__(self) -> "Inventario":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
     # -------- Persistencia y utilitarios internos --------
+    def _abrir_handle(self) -> None:
+        """
+        Abre (o reabre) el archivo en "r+b" y lo deja abierto para altas y parches.
+        Si no se puede (p. ej. archivo de solo lectura), se queda en None y esas
+        operaciones vuelven a abrir el archivo cada vez, reportando el error como antes.
+        """
+        self._cerrar_handle()
+        if self._cerrado:
+            return
+        try:
+            # Sin búfer: este manejador solo hace seek + lecturas/escrituras de una línea,
+            # y un búfer grande leería 1 MiB por cada parche (BUFFER_ES es para cargas/guardados completos)
+            self._fh = open(self.ruta_archivo, mode="r+b", buffering=0)
+        except OSError:
+            self._fh = None
+
     def _asegurar_archivo(self) -> Tuple[bool, str]:
         """
         Garantiza que el archivo exista y tenga encabezado. Si no existe, lo crea.
@@ -223,30 +469,71 @@ class Inventario:
         if not os.path.exists(self.ruta_archivo):
             return 0, 0, "Archivo no encontrado; se creará al guardar por primera vez."
         try:
-            with open(self.ruta_archivo, mode="r", encoding="utf-8", newline="") as f:
-                reader = csv.reader(f)
-                # Validamos encabezado si existe
-                first = next(reader, None)
-                if first is None:
+            with open(self.ruta_archivo, mode="rb", buffering=self.BUFFER_ES) as f:
+                # Leemos en binario para saber en qué byte empieza cada línea (ver _offsets)
+                crudo = f.readline()
+                if not crudo:
                     return 0, 0, "Archivo vacío; no hay datos que cargar."
+                inicio = len(crudo)
+                # Validamos encabezado si existe
+                try:
+                    first = _partir_linea(crudo)
+                except ValueError:
+                    first = []
                 header = [h.strip().lower() for h in first]
                 if header != self.ENCABEZADO:
                     # Si no hay encabezado válido, consideramos la primera fila como dato e intentamos parsearla
                     try:
                         prod = Producto.from_csv_row(first)
                         self.productos.append(prod)
+                        self._by_id[prod.get_id()] = prod
+                        self._offsets[prod.get_id()] = (0, inicio)
                         cargados += 1
                     except Exception:
                         corruptas += 1
-                for row in reader:
-                    try:
-                        prod = Producto.from_csv_row(row)
-                        # Evitamos duplicados por ID durante la carga
-                        if not self._existe_id(prod.get_id()):
-                            self.productos.append(prod)
-                            cargados += 1
-                    except Exception:
-                        corruptas += 1
+                # Referencias locales: en el bucle caliente evitamos self.<attr> y llamadas a métodos
+                by_id = self._by_id
+                offsets = self._offsets
+
+                def nuevos() -> Iterator[Producto]:
+                    nonlocal corruptas
+                    pos = inicio
+                    for crudo in f:
+                        if b'"' in crudo and crudo.count(b'"') % 2:
+                            # Comillas sin cerrar: el campo entrecomillado sigue en las líneas
+                            # siguientes; las juntamos para tratar el registro como uno solo
+                            partes = [crudo]
+                            comillas = crudo.count(b'"')
+                            for extra in f:
+                                partes.append(extra)
+                                comillas += extra.count(b'"')
+                                if comillas % 2 == 0:
+                                    break
+                            crudo = b"".join(partes)
+                        offset = pos
+                        pos += len(crudo)
+                        try:
+                            row = _partir_linea(crudo)
+                            try:
+                                prod = Producto._from_trusted_row(row)
+                            except Exception:
+                                # Fila rara: pasamos por el camino validado (si falla, cuenta como corrupta)
+                                prod = Producto.from_csv_row(row)
+                        except Exception:
+                            corruptas += 1
+                            continue
+                        # Internamos el ID aquí, al incorporarlo, para que el índice y la lista
+                        # compartan el mismo objeto str que sys.intern devuelve en el resto del programa
+                        id_ = prod._id = sys.intern(prod._id)
+                        # Evitamos duplicados por ID durante la carga (gana la primera aparición)
+                        if id_ not in by_id:
+                            by_id[id_] = prod
+                            offsets[id_] = (offset, len(crudo))
+                            yield prod
+
+                antes = len(self.productos)
+                self.productos.extend(nuevos())
+                cargados += len(self.productos) - antes
             msg = f"Cargados: {cargados}. Líneas corruptas: {corruptas}."
             return cargados, corruptas, msg
         except FileNotFoundError:
@@ -260,28 +547,174 @@ class Inventario:
         """
         Escribe TODO el inventario actual al archivo (sobrescritura segura).
         Devuelve (ok, mensaje). Si falla, la lista en memoria se mantiene.
+
+        Se escribe primero a '<archivo>.tmp' y luego se reemplaza el original con
+        os.replace (atómico): si el programa se interrumpe a mitad de la escritura,
+        el archivo anterior queda intacto en lugar de truncado. Si la ruta es un
+        enlace simbólico se reemplaza el archivo real (no el enlace), y se conservan
+        los permisos que tenía el archivo.
         """
+        destino = os.path.realpath(self.ruta_archivo)
+        tmp = destino + ".tmp"
         try:
-            with open(self.ruta_archivo, mode="w", encoding="utf-8", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(self.ENCABEZADO)
-                for p in self.productos:
-                    writer.writerow(p.to_csv_row())
+            # os.replace ignora los permisos del archivo destino; respetamos un archivo
+            # de solo lectura igual que antes (cuando se abría directamente con "w").
+            existe = os.path.exists(destino)
+            if existe and not os.access(destino, os.W_OK):
+                raise PermissionError(self.ruta_archivo)
+            # Escribimos las líneas ya formateadas (sin pasar por csv.writer) en binario,
+            # lo que además nos da la longitud en bytes de cada una para _offsets.
+            encabezado = (",".join(self.ENCABEZADO) + "\r\n").encode("utf-8")
+            lineas = [p.to_csv_line().encode("utf-8") for p in self.productos]
+            with open(tmp, mode="wb", buffering=self.BUFFER_ES) as f:
+                f.write(encabezado)
+                f.writelines(lineas)
+                f.flush()
+                os.fsync(f.fileno())
+            if existe:
+                shutil.copymode(destino, tmp)
+            # El manejador abierto apunta al archivo viejo (y en Windows impediría el
+            # reemplazo): lo cerramos y lo reabrimos sobre el archivo nuevo.
+            self._cerrar_handle()
+            try:
+                os.replace(tmp, destino)
+            finally:
+                self._abrir_handle()
+            # Nuevas posiciones de cada fila, para que actualizar() pueda seguir parcheando
+            offsets: Dict[str, Tuple[int, int]] = {}
+            pos = len(encabezado)
+            for p, linea in zip(self.productos, lineas):
+                offsets[p.get_id()] = (pos, len(linea))
+                pos += len(linea)
+            self._offsets = offsets
+            self._archivo_desincronizado = False
             return True, f"Inventario guardado en '{self.ruta_archivo}'."
         except PermissionError:
+            self._archivo_desincronizado = True
             return False, f"Permiso denegado para escribir en '{self.ruta_archivo}'."
         except OSError as e:
+            self._archivo_desincronizado = True
+            return False, f"Error de E/S al guardar: {e}"
+        finally:
+            # Si algo falló antes del replace, no dejamos el temporal tirado
+            if os.path.exists(tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+    def _append_to_archivo(self, p: Producto) -> Tuple[bool, str]:
+        """
+        Añade UNA fila al final del archivo, sin reescribir el resto: se posiciona al
+        final del manejador "r+b" que el inventario mantiene abierto (ver _archivo_rw).
+        Si el archivo no existe o está vacío (sin encabezado), se hace una escritura
+        completa para no perder el encabezado ni los productos ya en memoria.
+        Si el archivo (p. ej. editado a mano) no termina en salto de línea, se agrega
+        uno antes para no pegar la fila nueva a la última.
+        Si un guardado anterior falló, se reescribe todo para que el archivo vuelva
+        a coincidir con la memoria.
+        Devuelve (ok, mensaje) igual que _guardar_a_archivo.
+        """
+        if self._archivo_desincronizado:
+            return self._guardar_a_archivo()
+        try:
+            with self._archivo_rw() as f:
+                inicio = f.seek(0, os.SEEK_END)
+                if inicio > 0:
+                    f.seek(inicio - 1)
+                    if f.read(1) != b"\n":
+                        f.write(b"\r\n")
+                        inicio += 2
+                    linea = p.to_csv_line().encode("utf-8")
+                    f.write(linea)
+            if inicio == 0:
+                return self._guardar_a_archivo()
+            self._offsets[p.get_id()] = (inicio, len(linea))
+            return True, f"Inventario guardado en '{self.ruta_archivo}'."
+        except FileNotFoundError:
+            return self._guardar_a_archivo()
+        except PermissionError:
+            self._archivo_desincronizado = True
+            return False, f"Permiso denegado para escribir en '{self.ruta_archivo}'."
+        except OSError as e:
+            self._archivo_desincronizado = True
             return False, f"Error de E/S al guardar: {e}"
 
+    def _parchear_linea(self, p: Producto) -> Tuple[Optional[bool], str]:
+        """
+        Reescribe EN SU LUGAR la línea de un producto si la nueva fila ocupa
+        exactamente los mismos bytes que la anterior (sin tocar el resto del archivo).
+        Devuelve (ok, mensaje) como _guardar_a_archivo, o (None, "") si no se puede
+        parchear y hay que reescribir el archivo completo (también cuando un guardado
+        anterior falló y el archivo no coincide con la memoria).
+        """
+        if self._archivo_desincronizado:
+            return None, ""
+        posicion = self._offsets.get(p.get_id())
+        if posicion is None:
+            return None, ""
+        offset, longitud = posicion
+        linea = p.to_csv_line().encode("utf-8")
+        if len(linea) != longitud:
+            return None, ""
+        try:
+            with self._archivo_rw() as f:
+                f.seek(offset)
+                # Comprobamos que en esa posición sigue estando la fila de este producto
+                # (por si el archivo se editó desde fuera); si no, mejor reescribir todo.
+                anterior = f.read(longitud)
+                try:
+                    id_anterior = next(csv.reader([anterior.decode("utf-8")]))[0].strip()
+                except (UnicodeDecodeError, StopIteration, IndexError, csv.Error):
+                    return None, ""
+                if len(anterior) != longitud or id_anterior != p.get_id():
+                    return None, ""
+                f.seek(offset)
+                f.write(linea)
+            return True, f"Inventario guardado en '{self.ruta_archivo}'."
+        except FileNotFoundError:
+            # El archivo desapareció: que actualizar() lo reescriba completo
+            return None, ""
+        except PermissionError:
+            self._archivo_desincronizado = True
+            return False, f"Permiso denegado para escribir en '{self.ruta_archivo}'."
+        except OSError as e:
+            self._archivo_desincronizado = True
+            return False, f"Error de E/S al guardar: {e}"
+
+    @contextmanager
+    def _archivo_rw(self) -> Iterator[BinaryIO]:
+        """
+        Da el archivo abierto en "r+b": el manejador persistente si existe (y lo vacía
+        al terminar para que los datos lleguen al disco), o uno abierto solo para esta operación.
+
+        El manejador apunta al archivo (inodo) que se abrió, no a la ruta: si desde
+        fuera lo borraron o reemplazaron (p. ej. otro Inventario que guardó con
+        os.replace), se reabre sobre el archivo actual. Si ya no existe, se cierra
+        y se lanza FileNotFoundError para que el llamador reescriba todo.
+        """
+        if self._fh is not None:
+            try:
+                st = os.stat(self.ruta_archivo)
+            except FileNotFoundError:
+                self._cerrar_handle()
+                raise
+            fst = os.fstat(self._fh.fileno())
+            if (st.st_ino, st.st_dev) != (fst.st_ino, fst.st_dev):
+                self._abrir_handle()
+        fh = self._fh
+        if fh is not None:
+            yield fh
+            fh.flush()
+        else:
+            with open(self.ruta_archivo, mode="r+b", buffering=0) as f:
+                yield f
+
     def _existe_id(self, id_producto: str) -> bool:
-        return any(p.get_id() == id_producto for p in self.productos)
+        return id_producto in self._by_id
 
     def _buscar_por_id(self, id_producto: str) -> Optional[Producto]:
-        id_producto = str(id_producto).strip()
-        for p in self.productos:
-            if p.get_id() == id_producto:
-                return p
-        return None
+        return self._by_id.get(str(id_producto).strip())
 
 
 # ============================
@@ -319,6 +752,15 @@ def _pedir_int(msg: str) -> int:
             print("Entrada inválida. Intente de nuevo.")
 
 
+def _imprimir_productos(productos: Sequence[Producto]) -> None:
+    """
+    Imprime un producto por línea con UNA sola escritura a stdout
+    (en vez de un print por producto, que con listados largos es mucho más lento).
+    """
+    sys.stdout.write("\n".join("   " + str(p) for p in productos) + "\n")
+    sys.stdout.flush()
+
+
 def main():
     """
     Bucle principal del programa (CLI) con persistencia:
@@ -337,86 +779,89 @@ def main():
     #     ok, msg = inventario.agregar_producto(Producto("A001", "Agua 600ml", 20, 0.6))
     #     print(f"[ARRANQUE] {msg}")
 
-    while True:
-        _mostrar_menu()
-        opcion = input("Seleccione una opción: ").strip()
-
-        if opcion == "1":
-            # --- Añadir producto ---
-            print("-- Añadir nuevo producto --")
-            idp = input("ID: ").strip()
-            nombre = input("Nombre: ").strip()
-            cantidad = _pedir_int("Cantidad: ")
-            precio = _pedir_float("Precio (USD): ")
-            try:
-                prod = Producto(idp, nombre, cantidad, precio)
-                ok, msg = inventario.agregar_producto(prod)
+    # try/finally: el archivo abierto se cierra también ante Ctrl-C (KeyboardInterrupt)
+    # o fin de entrada (EOFError en input()), no solo con la opción 6.
+    try:
+        while True:
+            _mostrar_menu()
+            opcion = input("Seleccione una opción: ").strip()
+
+            if opcion == "1":
+                # --- Añadir producto ---
+                print("-- Añadir nuevo producto --")
+                idp = input("ID: ").strip()
+                nombre = input("Nombre: ").strip()
+                cantidad = _pedir_int("Cantidad: ")
+                precio = _pedir_float("Precio (USD): ")
+                try:
+                    prod = Producto(idp, nombre, cantidad, precio)
+                    ok, msg = inventario.agregar_producto(prod)
+                    estado = "OK" if ok else "FALLO"
+                    print(f"[{estado}] {msg}\n")
+                except Exception as e:
+                    print(f"[FALLO] Error: {e}\n")
+
+            elif opcion == "2":
+                # --- Eliminar por ID ---
+                print("-- Eliminar producto --")
+                idp = input("ID del producto a eliminar: ").strip()
+                ok, msg = inventario.eliminar_por_id(idp)
                 estado = "OK" if ok else "FALLO"
                 print(f"[{estado}] {msg}\n")
-            except Exception as e:
-                print(f"[FALLO] Error: {e}\n")
-
-        elif opcion == "2":
-            # --- Eliminar por ID ---
-            print("-- Eliminar producto --")
-            idp = input("ID del producto a eliminar: ").strip()
-            ok, msg = inventario.eliminar_por_id(idp)
-            estado = "OK" if ok else "FALLO"
-            print(f"[{estado}] {msg}\n")
-
-        elif opcion == "3":
-            # --- Actualizar (cantidad y/o precio) ---
-            print("-- Actualizar producto --")
-            idp = input("ID del producto a actualizar: ").strip()
-            print("Deje vacío si NO desea cambiar ese campo.")
-            cant_str = input("Nueva cantidad: ").strip()
-            prec_str = input("Nuevo precio (USD): ").strip()
 
-            try:
-                cantidad = None
-                precio = None
-                if cant_str != "":
-                    cantidad = int(cant_str)
-                if prec_str != "":
-                    precio = float(prec_str.replace(",", "."))
-                ok, msg = inventario.actualizar(idp, cantidad=cantidad, precio=precio)
-                estado = "OK" if ok else "FALLO"
-                print(f"[{estado}] {msg}\n")
-            except ValueError as e:
-                print(f"[FALLO] Error: {e}\n")
-            except Exception as e:
-                print(f"[FALLO] Error inesperado: {e}\n")
-
-        elif opcion == "4":
-            # --- Buscar por nombre ---
-            print("-- Buscar productos --")
-            termino = input("Buscar por nombre: ").strip()
-            resultados = inventario.buscar_por_nombre(termino)
-            if resultados:
-                print("Resultados:")
-                for p in resultados:
-                    print("  ", p)
-            else:
-                print("No se encontraron productos que coincidan.")
-            print()
-
-        elif opcion == "5":
-            # --- Listar todos ---
-            print("-- Inventario actual --")
-            productos = inventario.mostrar_todos()
-            if not productos:
-                print("(vacío)\n")
-            else:
-                for p in productos:
-                    print("  ", p)
+            elif opcion == "3":
+                # --- Actualizar (cantidad y/o precio) ---
+                print("-- Actualizar producto --")
+                idp = input("ID del producto a actualizar: ").strip()
+                print("Deje vacío si NO desea cambiar ese campo.")
+                cant_str = input("Nueva cantidad: ").strip()
+                prec_str = input("Nuevo precio (USD): ").strip()
+
+                try:
+                    cantidad = None
+                    precio = None
+                    if cant_str != "":
+                        cantidad = int(cant_str)
+                    if prec_str != "":
+                        precio = float(prec_str.replace(",", "."))
+                    ok, msg = inventario.actualizar(idp, cantidad=cantidad, precio=precio)
+                    estado = "OK" if ok else "FALLO"
+                    print(f"[{estado}] {msg}\n")
+                except ValueError as e:
+                    print(f"[FALLO] Error: {e}\n")
+                except Exception as e:
+                    print(f"[FALLO] Error inesperado: {e}\n")
+
+            elif opcion == "4":
+                # --- Buscar por nombre ---
+                print("-- Buscar productos --")
+                termino = input("Buscar por nombre: ").strip()
+                resultados = inventario.buscar_por_nombre(termino)
+                if resultados:
+                    print("Resultados:")
+                    _imprimir_productos(resultados)
+                else:
+                    print("No se encontraron productos que coincidan.")
                 print()
 
-        elif opcion == "6":
-            print("Saliendo... ¡Hasta luego!")
-            break
+            elif opcion == "5":
+                # --- Listar todos ---
+                print("-- Inventario actual --")
+                productos = inventario.mostrar_todos()
+                if not productos:
+                    print("(vacío)\n")
+                else:
+                    _imprimir_productos(productos)
+                    print()
 
-        else:
-            print("Opción inválida. Intente nuevamente.\n")
+            elif opcion == "6":
+                print("Saliendo... ¡Hasta luego!")
+                break
+
+            else:
+                print("Opción inválida. Intente nuevamente.\n")
+    finally:
+        inventario.close()
 
 
 # Punto de entrada del script
@@ -432,6 +877,11 @@ Ideas de pruebas manuales (rápidas):
 5) Editar el archivo a mano y corromper una línea (p. ej., borrar una columna):
    - El programa debe ignorar esa línea y reportar 'Líneas corruptas: N'.
 6) Simular permiso denegado (en Unix: 'chmod -w inventario.txt') y luego intentar agregar:
-   - La operación debe indicar 'Actualizado/Agregado en memoria, pero no se pudo guardar: Permiso denegado...'.
+   - Con 'chmod -w' ANTES de abrir el programa, la operación debe indicar
+     'Actualizado/Agregado en memoria, pero no se pudo guardar: Permiso denegado...'.
+   - Inconsistencia conocida: si se hace 'chmod -w' CON el programa abierto, agregar y
+     actualizar SÍ se guardan (escriben por el handle "r+b" que ya estaba abierto, y el
+     permiso solo se comprueba al abrir), mientras que eliminar (y cualquier operación que
+     reescriba el archivo completo) SÍ falla con 'Permiso denegado'.
 7) Duplicar ID: al intentar agregar, debe avisar que el ID ya existe.
 """